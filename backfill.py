@@ -0,0 +1,281 @@
+"""Import hors ligne de journaux série et d'exports CSV dans la base
+
+Usage: python backfill.py captures/*.log dump.csv [--debut "2025-12-01 08:00:00"] [--fuseau Europe/Paris]
+   ou: python iot_site.py backfill ...
+
+Les horodatages des journaux (--fuseau, heure locale par défaut) sont convertis en UTC,
+comme CURRENT_TIMESTAMP des lignes enregistrées en direct; ceux des exports CSV de
+sensor_data sont déjà en UTC (--fuseau-csv). Une ligne est considérée déjà présente si la
+même machine a la même mesure à --tolerance secondes près: le serveur horodate à la
+réception, le logger à l'émission.
+"""
+import argparse
+import mmap
+import os
+import re
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from trames import analyser_trame, extraire_machine
+
+TAILLE_BLOC = 8 * 1024 * 1024   # Octets analysés par tâche du pool
+TAILLE_LOT = 100000             # Lignes insérées par transaction
+TOLERANCE = 1                   # Secondes d'écart admises pour reconnaître une ligne déjà présente
+
+# Horodatage en tête de ligne du logger ou colonne CSV: 2025-12-01 23:13:59 / 2025-12-01T23:13:59
+RE_HORODATAGE = re.compile(r'(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2}:\d{2})')
+
+def fuseau_horaire(fuseau):
+    """'local', 'UTC', décalage ±HH:MM ou nom IANA (Europe/Paris); None pour l'heure locale"""
+    if fuseau == 'local':
+        return None
+    if fuseau.upper() == 'UTC':
+        return timezone.utc
+    decalage = re.fullmatch(r'([+-])(\d{2}):(\d{2})', fuseau)
+    if decalage:
+        signe = -1 if decalage.group(1) == '-' else 1
+        return timezone(signe * timedelta(hours=int(decalage.group(2)), minutes=int(decalage.group(3))))
+    from zoneinfo import ZoneInfo  # Sous Windows: pip install tzdata
+    return ZoneInfo(fuseau)
+
+def convertisseur_utc(fuseau):
+    """Fonction 'AAAA-MM-JJ HH:MM:SS' local → UTC; décalage calculé une fois par heure"""
+    tz = fuseau_horaire(fuseau)
+    if tz is timezone.utc:
+        return lambda ts: ts
+    
+    decalages = {}
+    def convertir(ts):
+        heure = ts[:13]
+        decalage = decalages.get(heure)
+        if decalage is None:
+            debut_heure = datetime.fromisoformat(heure + ':00:00')
+            debut_heure = debut_heure.astimezone() if tz is None else debut_heure.replace(tzinfo=tz)
+            decalage = decalages[heure] = debut_heure.utcoffset()
+        return (datetime.fromisoformat(ts) - decalage).strftime('%Y-%m-%d %H:%M:%S')
+    return convertir
+
+def convertir_mesures(champs):
+    v, vp, p, pp, s = champs
+    return (float(v), int(vp), int(float(p)), int(pp), int(s))
+
+def analyser_csv(line):
+    """Ligne d'export: [id,]timestamp,vibration,vibration_percent,pressure,pressure_percent,status[,machine]
+
+    La colonne de l'horodatage (1re ou 2e) fixe la disposition, puis chaque champ est lu à sa
+    position. Retourne (timestamp, mesure, machine) ou None (en-tête, ligne tronquée).
+    """
+    champs = [c.strip().strip('"') for c in line.split(',')]
+    for pos in (0, 1):
+        ts_match = RE_HORODATAGE.fullmatch(champs[pos]) if len(champs) > pos else None
+        if ts_match is None:
+            continue
+        if len(champs) not in (pos + 6, pos + 7):
+            return None
+        try:
+            mesure = convertir_mesures(champs[pos + 1:pos + 6])
+        except ValueError:
+            return None
+        machine = champs[pos + 6] or None if len(champs) == pos + 7 else None
+        return f'{ts_match.group(1)} {ts_match.group(2)}', mesure, machine
+    return None
+
+def horodatage_valide(timestamp):
+    """Écarte les dates impossibles d'une capture corrompue (2025-12-01 25:00:04)"""
+    try:
+        datetime.fromisoformat(timestamp)
+        return True
+    except ValueError:
+        return False
+
+def analyser_ligne(line):
+    """Retourne ((timestamp, vibration, vibration_percent, pressure, pressure_percent, status, machine),
+    est_csv) ou (None, False)
+
+    timestamp et machine valent None s'ils ne figurent pas dans la ligne.
+    """
+    mesure = analyser_trame(line)
+    if mesure is not None:
+        machine = extraire_machine(line, None)
+        ts_match = RE_HORODATAGE.search(line)
+        timestamp = f'{ts_match.group(1)} {ts_match.group(2)}' if ts_match else None
+        est_csv = False
+    elif ',' in line:
+        resultat = analyser_csv(line)
+        if resultat is None:
+            return None, False
+        timestamp, mesure, machine = resultat
+        est_csv = True
+    else:
+        return None, False
+    
+    if timestamp is not None and not horodatage_valide(timestamp):
+        return None, False
+    return (timestamp,) + mesure + (machine,), est_csv
+
+def decouper(chemin, fuseaux, taille_bloc=TAILLE_BLOC):
+    """Découpe un fichier en blocs (debut, fin) alignés sur les fins de ligne"""
+    taille = os.path.getsize(chemin)
+    if taille == 0:
+        return []
+    
+    blocs = []
+    with open(chemin, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        debut = 0
+        while debut < taille:
+            fin = mm.find(b'\n', min(debut + taille_bloc, taille))
+            fin = taille if fin == -1 else fin + 1
+            blocs.append((chemin, debut, fin, fuseaux))
+            debut = fin
+    return blocs
+
+def analyser_bloc(tache):
+    """Analyse un bloc dans un processus du pool: (lignes, nombre de lignes rejetées)"""
+    chemin, debut, fin, (fuseau, fuseau_csv) = tache
+    with open(chemin, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        donnees = mm[debut:fin]
+    
+    vers_utc = convertisseur_utc(fuseau)
+    csv_vers_utc = convertisseur_utc(fuseau_csv)
+    lignes = []
+    rejets = 0
+    for brut in donnees.split(b'\n'):
+        line = brut.decode('utf-8', errors='ignore').strip()
+        if not line:
+            continue
+        ligne, est_csv = analyser_ligne(line)
+        if ligne is None:
+            rejets += 1
+        elif ligne[0] is None:
+            lignes.append(ligne)
+        else:
+            convertir = csv_vers_utc if est_csv else vers_utc
+            lignes.append((convertir(ligne[0]),) + ligne[1:])
+    return lignes, rejets
+
+def resultats_ordonnes(taches, processus):
+    """Résultats du pool dans l'ordre des blocs, avec un nombre borné de blocs en mémoire"""
+    with ProcessPoolExecutor(max_workers=processus) as pool:
+        en_cours = deque()
+        for tache in taches:
+            en_cours.append(pool.submit(analyser_bloc, tache))
+            if len(en_cours) >= 2 * processus:
+                yield en_cours.popleft().result()
+        while en_cours:
+            yield en_cours.popleft().result()
+
+def inserer_lot(conn, lignes, tolerance=TOLERANCE):
+    """Insère un lot en une transaction, sans les lignes déjà présentes; retourne le nombre inséré"""
+    conn.execute('BEGIN')
+    conn.execute('DELETE FROM import_tmp')
+    conn.executemany('INSERT INTO import_tmp VALUES (?, ?, ?, ?, ?, ?, ?)', lignes)
+    c = conn.execute('''INSERT INTO sensor_data 
+                        (timestamp, vibration, vibration_percent, pressure, pressure_percent, status, machine)
+                        SELECT DISTINCT t.timestamp, t.vibration, t.vibration_percent, 
+                               t.pressure, t.pressure_percent, t.status, t.machine
+                        FROM import_tmp t
+                        WHERE NOT EXISTS (SELECT 1 FROM sensor_data s
+                                          WHERE s.timestamp BETWEEN datetime(t.timestamp, :avant)
+                                                                AND datetime(t.timestamp, :apres)
+                                            AND s.machine = t.machine
+                                            AND s.vibration = t.vibration
+                                            AND s.pressure = t.pressure
+                                            AND s.status = t.status)''',
+                     {'avant': f'-{tolerance} seconds', 'apres': f'+{tolerance} seconds'})
+    inseres = c.rowcount
+    conn.execute('COMMIT')
+    return inseres
+
+def backfill(fichiers, db_name, machine, processus=None, debut=None, intervalle=2.0,
+             taille_lot=TAILLE_LOT, fuseau='local', tolerance=TOLERANCE, fuseau_csv='UTC'):
+    """Importe les fichiers; les trames sans horodatage sont datées depuis `debut` (heure de
+    `fuseau`) si fourni, celles sans identifiant sont attribuées à `machine`"""
+    processus = processus or os.cpu_count() or 1
+    taches = [bloc for chemin in fichiers for bloc in decouper(chemin, (fuseau, fuseau_csv))]
+    vers_utc = convertisseur_utc(fuseau)
+    
+    # synchronous par défaut: la base est partagée avec le serveur en direct
+    conn = sqlite3.connect(db_name, isolation_level=None)
+    conn.execute('''CREATE TEMP TABLE import_tmp
+                    (timestamp DATETIME, vibration REAL, vibration_percent INTEGER,
+                     pressure INTEGER, pressure_percent INTEGER, status INTEGER, machine TEXT)''')
+    
+    stats = {'lues': 0, 'inserees': 0, 'rejetees': 0, 'sans_horodatage': 0}
+    t0 = time.perf_counter()
+    lot = []
+    rang = 0  # Rang des trames non datées, dans l'ordre des fichiers
+    
+    for lignes, rejets in resultats_ordonnes(taches, processus):
+        stats['rejetees'] += rejets
+        stats['lues'] += len(lignes) + rejets
+        for ligne in lignes:
+            timestamp = ligne[0]
+            if timestamp is None:
+                if debut is None:
+                    stats['sans_horodatage'] += 1
+                    continue
+                horodatage = debut + timedelta(seconds=rang * intervalle)
+                timestamp = vers_utc(horodatage.strftime('%Y-%m-%d %H:%M:%S'))
+                rang += 1
+            lot.append((timestamp,) + ligne[1:-1] + (ligne[-1] or machine,))
+        
+        if len(lot) >= taille_lot:
+            stats['inserees'] += inserer_lot(conn, lot, tolerance)
+            lot = []
+            duree = time.perf_counter() - t0
+            print(f"📥 {stats['lues']} lignes lues, {stats['inserees']} insérées "
+                  f"({stats['lues'] / duree:.0f} lignes/s)")
+    
+    if lot:
+        stats['inserees'] += inserer_lot(conn, lot, tolerance)
+    conn.close()
+    
+    stats['duree_s'] = round(time.perf_counter() - t0, 2)
+    stats['lignes_par_s'] = round(stats['lues'] / stats['duree_s']) if stats['duree_s'] else 0
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import hors ligne de journaux série / CSV')
+    parser.add_argument('fichiers', nargs='+', help='captures série ou exports CSV')
+    parser.add_argument('--db', help='base SQLite (défaut: Config.DB_NAME)')
+    parser.add_argument('--processus', type=int, help="processus d'analyse (défaut: nombre de CPU)")
+    parser.add_argument('--debut', help='horodatage de la première trame non datée (AAAA-MM-JJ HH:MM:SS)')
+    parser.add_argument('--intervalle', type=float, default=2.0, help='secondes entre trames non datées')
+    parser.add_argument('--fuseau', default='local',
+                        help="fuseau des horodatages des captures: local (défaut), UTC, +01:00 ou Europe/Paris")
+    parser.add_argument('--fuseau-csv', default='UTC',
+                        help='fuseau des horodatages des exports CSV (défaut: UTC, celui de sensor_data)')
+    parser.add_argument('--tolerance', type=int, default=TOLERANCE,
+                        help='écart (s) sous lequel une mesure identique est considérée déjà présente')
+    parser.add_argument('--machine', help='machine des lignes sans ID: (défaut: Config.MACHINE_ID)')
+    parser.add_argument('--taille-lot', type=int, default=TAILLE_LOT, help='lignes par transaction')
+    args = parser.parse_args(argv)
+    
+    from iot_site import Config, init_db
+    db_name = args.db or Config.DB_NAME
+    Config.DB_NAME = db_name
+    for fuseau in (args.fuseau, args.fuseau_csv):
+        try:
+            convertisseur_utc(fuseau)  # Fuseau invalide: erreur avant de lancer le pool
+        except Exception as e:
+            parser.error(f'fuseau invalide: {e}')
+    if not init_db():
+        return 1
+    
+    debut = datetime.strptime(args.debut, '%Y-%m-%d %H:%M:%S') if args.debut else None
+    stats = backfill(args.fichiers, db_name, args.machine or Config.MACHINE_ID,
+                     args.processus, debut, args.intervalle, args.taille_lot,
+                     args.fuseau, args.tolerance, args.fuseau_csv)
+    
+    print("=" * 60)
+    print(f"✅ Backfill terminé en {stats['duree_s']} s ({stats['lignes_par_s']} lignes/s)")
+    print(f"📊 Lues: {stats['lues']} | Insérées: {stats['inserees']} | "
+          f"Rejetées: {stats['rejetees']} | Sans horodatage: {stats['sans_horodatage']}")
+    print("=" * 60)
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,160 @@
+"""Agrégation de flotte: statistiques par étiquette (ligne, zone, usine) mises à jour à chaque trame"""
+import heapq
+import json
+import os
+import threading
+
+METRIQUES = ('vibration', 'pressure')
+
+def valider_etiquettes(etiquettes):
+    """Lève ValueError si le fichier n'a pas la forme {machine: {étiquette: valeur simple}}"""
+    if not isinstance(etiquettes, dict):
+        raise ValueError("un objet {machine: {étiquette: valeur}} est attendu")
+    for machine, tags in etiquettes.items():
+        if not isinstance(tags, dict):
+            raise ValueError(f"{machine}: un objet d'étiquettes est attendu ({tags!r})")
+        for cle, valeur in tags.items():
+            if not isinstance(valeur, (str, int, float)):
+                raise ValueError(f"{machine}.{cle}: valeur simple attendue ({valeur!r})")
+
+def charger_etiquettes(chemin):
+    """Charge les étiquettes des machines: {"machine_1": {"line": "L1", "zone": "Z2"}}"""
+    if not chemin or not os.path.exists(chemin):
+        return {}
+    try:
+        with open(chemin, encoding='utf-8') as f:
+            etiquettes = json.load(f)
+        valider_etiquettes(etiquettes)
+        return etiquettes
+    except Exception as e:
+        print(f"⚠️ Fichier flotte ignoré (pas d'étiquettes): {e}")
+        return {}
+
+class Extremes:
+    """Min/max d'un groupe via deux tas à suppression paresseuse"""
+    
+    def __init__(self):
+        self.bas = []   # (valeur, seq, machine)
+        self.haut = []  # (-valeur, seq, machine)
+    
+    def ajouter(self, valeur, seq, machine):
+        heapq.heappush(self.bas, (valeur, seq, machine))
+        heapq.heappush(self.haut, (-valeur, seq, machine))
+    
+    def nettoyer(self, machines, nombre):
+        """Retire les entrées périmées du sommet; compacte si les tas ont trop grossi"""
+        for tas in (self.bas, self.haut):
+            while tas and machines[tas[0][2]]['seq'] != tas[0][1]:
+                heapq.heappop(tas)
+        
+        # Reconstruction amortie: au plus une fois toutes les ~nombre mises à jour
+        if len(self.bas) > 2 * nombre + 32:
+            self.bas = [e for e in self.bas if machines[e[2]]['seq'] == e[1]]
+            self.haut = [e for e in self.haut if machines[e[2]]['seq'] == e[1]]
+            heapq.heapify(self.bas)
+            heapq.heapify(self.haut)
+    
+    def minimum(self):
+        return self.bas[0][0] if self.bas else None
+    
+    def maximum(self):
+        return -self.haut[0][0] if self.haut else None
+
+class Groupe:
+    """Compteurs d'un groupe de machines partageant une étiquette"""
+    
+    def __init__(self):
+        self.machines = 0
+        self.statuts = {}
+        self.somme = {m: 0.0 for m in METRIQUES}
+        self.nombre = {m: 0 for m in METRIQUES}
+        self.extremes = {m: Extremes() for m in METRIQUES}
+    
+    def retirer(self, etat):
+        """Soustrait l'ancienne contribution d'une machine"""
+        if etat['status'] is not None:
+            self.statuts[etat['status']] -= 1
+            if self.statuts[etat['status']] == 0:
+                del self.statuts[etat['status']]
+        for m in METRIQUES:
+            if etat[m] is not None:
+                self.somme[m] -= etat[m]
+                self.nombre[m] -= 1
+    
+    def ajouter(self, machine, etat, machines):
+        """Ajoute la nouvelle contribution d'une machine"""
+        if etat['status'] is not None:
+            self.statuts[etat['status']] = self.statuts.get(etat['status'], 0) + 1
+        for m in METRIQUES:
+            if etat[m] is not None:
+                self.somme[m] += etat[m]
+                self.nombre[m] += 1
+                self.extremes[m].ajouter(etat[m], etat['seq'], machine)
+            self.extremes[m].nettoyer(machines, self.nombre[m])
+    
+    def resume(self):
+        resultat = {
+            'machines': self.machines,
+            'status': {str(code): n for code, n in sorted(self.statuts.items())}
+        }
+        for m in METRIQUES:
+            n = self.nombre[m]
+            resultat[m] = {
+                'min': self.extremes[m].minimum(),
+                'max': self.extremes[m].maximum(),
+                'mean': round(self.somme[m] / n, 3) if n else None
+            }
+        return resultat
+
+class Flotte:
+    """Vue agrégée de toutes les machines, tenue à jour trame par trame"""
+    
+    def __init__(self, etiquettes=None):
+        self.etiquettes = etiquettes or {}
+        self.machines = {}  # machine -> dernière mesure + groupes
+        self.total = Groupe()
+        self.groupes = {}   # (étiquette, valeur) -> Groupe
+        self.seq = 0
+        self.verrou = threading.Lock()
+    
+    def groupes_de(self, machine):
+        groupes = [self.total]
+        for cle, valeur in self.etiquettes.get(machine, {}).items():
+            groupe = self.groupes.get((cle, valeur))
+            if groupe is None:
+                groupe = self.groupes[(cle, valeur)] = Groupe()
+            groupes.append(groupe)
+        return groupes
+    
+    def mettre_a_jour(self, machine, status, vibration=None, pressure=None):
+        """Intègre une trame; les mesures absentes gardent leur dernière valeur"""
+        with self.verrou:
+            etat = self.machines.get(machine)
+            if etat is None:
+                etat = {'seq': 0, 'status': None, 'vibration': None, 'pressure': None,
+                        'groupes': self.groupes_de(machine)}
+                self.machines[machine] = etat
+                for groupe in etat['groupes']:
+                    groupe.machines += 1
+            else:
+                for groupe in etat['groupes']:
+                    groupe.retirer(etat)
+            
+            etat['status'] = status
+            if vibration is not None:
+                etat['vibration'] = vibration
+            if pressure is not None:
+                etat['pressure'] = pressure
+            self.seq += 1
+            etat['seq'] = self.seq
+            
+            for groupe in etat['groupes']:
+                groupe.ajouter(machine, etat, self.machines)
+    
+    def resume(self):
+        """Vue de la flotte: coût proportionnel au nombre de groupes, pas de machines"""
+        with self.verrou:
+            par_etiquette = {}
+            for (cle, valeur), groupe in self.groupes.items():
+                par_etiquette.setdefault(cle, {})[valeur] = groupe.resume()
+            return {'fleet': self.total.resume(), 'by_tag': par_etiquette}
@@ -1,11 +1,15 @@
-from flask import Flask, render_template_string, jsonify
-import threading
 import time
+T0_DEMARRAGE = time.perf_counter()  # Référence pour mesurer le temps jusqu'à la première requête
+
+from flask import Flask, render_template_string, jsonify, request, Response
+import threading
 import sqlite3
 import os
+import json
+import gzip
+import sys
 from datetime import datetime
-import serial
-import re
+from trames import analyser_trame, extraire_machine
 
 app = Flask(__name__)
 
@@ -14,6 +18,20 @@ class Config:
     DB_NAME = 'industrial_data.db'
     SERIAL_PORT = 'COM3'  # VSPE: COM1 ↔ COM3
     BAUD_RATE = 9600
+    # Démarrage rapide: le serveur répond tout de suite, BD et cache préparés en arrière-plan
+    DEMARRAGE_RAPIDE = os.environ.get('DEMARRAGE_RAPIDE', '1') != '0'
+    # Les réponses plus petites ne gagnent rien à être compressées
+    TAILLE_MIN_GZIP = 512
+    # Les clés ?since= changent à chaque donnée: le cache est vidé au-delà de cette taille
+    TAILLE_MAX_CACHE = 64
+    # Machine par défaut si la trame ne porte pas d'identifiant (ID:...): c'est elle
+    # qu'affichent /api/current et le tableau de bord, les autres passent par /api/fleet
+    MACHINE_ID = os.environ.get('MACHINE_ID', 'machine_1')
+    # Étiquettes des machines (ligne, zone, usine) pour /api/fleet
+    FICHIER_FLOTTE = os.environ.get('FICHIER_FLOTTE', 'flotte.json')
+    # Seuils par machine évalués sur l'hôte (JSON ou YAML), rechargés à chaud
+    FICHIER_PROFILS = os.environ.get('FICHIER_PROFILS', 'profils.json')
+    INTERVALLE_RECHARGEMENT = 2.0  # Secondes entre deux vérifications du fichier
 
 # Données en temps réel
 current_data = {
@@ -24,15 +42,94 @@ current_data = {
     'status': None,
     'last_update': None,
     'data_source': 'attente_arduino',
-    'serial_active': False
+    'serial_active': False,
+    'machine': Config.MACHINE_ID,
+    'host_status': None
 }
 
 # Variables série
 ser = None
 serial_active = False
 
+# État du démarrage (exposé par /api/health)
+etat_demarrage = {
+    'db_prete': False,
+    'cache_chaud': False,
+    'serie_demarree': False,
+    'pret_ms': None,
+    'premiere_requete_ms': None
+}
+db_prete = threading.Event()
+
+# Version des données: incrémentée à chaque changement, sert de clé au cache des réponses
+version_donnees = 0
+verrou_version = threading.Lock()
+# Évite de réutiliser un ETag d'un lancement précédent, même relancé dans la même seconde
+ID_DEMARRAGE = f'{int(time.time()):x}-{os.urandom(4).hex()}'
+cache_reponses = {}
+
+def marquer_modification():
+    """Invalide les réponses API en cache"""
+    global version_donnees
+    with verrou_version:
+        version_donnees += 1
+
+# Agrégateur de flotte (module importé à la première trame)
+agregateur_flotte = None
+verrou_flotte = threading.Lock()
+
+def obtenir_flotte():
+    """Crée l'agrégateur de flotte au premier usage"""
+    global agregateur_flotte
+    if agregateur_flotte is None:
+        with verrou_flotte:
+            if agregateur_flotte is None:
+                from flotte import Flotte, charger_etiquettes
+                agregateur_flotte = Flotte(charger_etiquettes(Config.FICHIER_FLOTTE))
+    return agregateur_flotte
+
+# Moteur de règles (NumPy importé à la première trame; False si indisponible)
+moteur_regles = None
+verrou_regles = threading.Lock()
+
+def obtenir_regles():
+    """Crée le moteur de règles au premier usage; None si NumPy manque"""
+    global moteur_regles
+    if moteur_regles is None:
+        with verrou_regles:
+            if moteur_regles is None:
+                try:
+                    from regles import MoteurRegles
+                except ImportError as e:
+                    print(f"⚠️ Moteur de règles désactivé: {e}")
+                    moteur_regles = False
+                else:
+                    moteur_regles = MoteurRegles(Config.FICHIER_PROFILS, Config.INTERVALLE_RECHARGEMENT,
+                                                 au_rechargement=marquer_modification)
+    return moteur_regles or None
+
+def mettre_a_jour_flotte(machine, status, vibration=None, pressure=None):
+    """Intègre la trame aux agrégats de flotte; une erreur ne fait pas perdre la trame"""
+    try:
+        obtenir_flotte().mettre_a_jour(machine, status, vibration, pressure)
+    except Exception as e:
+        print(f"❌ Erreur flotte ({machine}): {e}")
+
+def evaluer_regles(machine, vibration, pressure):
+    """Statut selon le profil de la machine; None si le moteur est indisponible ou en erreur"""
+    try:
+        moteur = obtenir_regles()
+        return moteur.evaluer(machine, vibration, pressure) if moteur else None
+    except Exception as e:
+        print(f"❌ Erreur règles ({machine}): {e}")
+        return None
+
+def duree_depuis_demarrage():
+    """Millisecondes écoulées depuis le lancement du processus"""
+    return round((time.perf_counter() - T0_DEMARRAGE) * 1000, 1)
+
 def init_db():
-    """Initialise la base de données"""
+    """Initialise la base de données; retourne False si elle est inutilisable"""
     try:
         conn = sqlite3.connect(Config.DB_NAME)
         c = conn.cursor()
@@ -43,37 +140,100 @@ def init_db():
                       vibration_percent INTEGER,
                       pressure INTEGER,
                       pressure_percent INTEGER,
-                      status INTEGER)''')
+                      status INTEGER,
+                      machine TEXT)''')
+        
+        # Migration: bases créées avant la colonne machine
+        colonnes = [col[1] for col in c.execute('PRAGMA table_info(sensor_data)')]
+        if 'machine' not in colonnes:
+            c.execute('ALTER TABLE sensor_data ADD COLUMN machine TEXT')
+            c.execute('UPDATE sensor_data SET machine = ? WHERE machine IS NULL', (Config.MACHINE_ID,))
+            print(f"🔧 Colonne machine ajoutée (lignes existantes: {Config.MACHINE_ID})")
+        
+        # Historique et dédoublonnage du backfill
+        c.execute('CREATE INDEX IF NOT EXISTS idx_sensor_timestamp ON sensor_data (timestamp)')
         conn.commit()
         conn.close()
         print("✅ Base de données initialisée")
+        return True
     except Exception as e:
         print(f"❌ Erreur BD: {e}")
+        return False
 
-def save_data(vibration, vibration_percent, pressure, pressure_percent, status):
+def save_data(vibration, vibration_percent, pressure, pressure_percent, status, machine=None):
     """Sauvegarde les données Arduino"""
     try:
         conn = sqlite3.connect(Config.DB_NAME)
         c = conn.cursor()
         c.execute('''INSERT INTO sensor_data 
-                     (vibration, vibration_percent, pressure, pressure_percent, status) 
-                     VALUES (?, ?, ?, ?, ?)''',
-                  (vibration, vibration_percent, pressure, pressure_percent, status))
+                     (vibration, vibration_percent, pressure, pressure_percent, status, machine) 
+                     VALUES (?, ?, ?, ?, ?, ?)''',
+                  (vibration, vibration_percent, pressure, pressure_percent, status,
+                   machine or Config.MACHINE_ID))
         conn.commit()
         conn.close()
-        print(f"💾 Données sauvegardées: V:{vibration}g P:{pressure} E:{status}")
+        print(f"💾 Données sauvegardées: {machine or Config.MACHINE_ID} V:{vibration}g P:{pressure} E:{status}")
         return True
     except Exception as e:
         print(f"❌ Erreur sauvegarde: {e}")
         return False
 
+def rechauffer_cache():
+    """Initialise la BD et recharge la dernière mesure connue; False si la BD est inutilisable"""
+    if not init_db():
+        return False
+    db_prete.set()
+    etat_demarrage['db_prete'] = True
+    
+    try:
+        conn = sqlite3.connect(Config.DB_NAME)
+        c = conn.cursor()
+        c.execute('''SELECT timestamp, vibration, vibration_percent, pressure, pressure_percent, status 
+                     FROM sensor_data 
+                     WHERE machine = ?
+                     ORDER BY id DESC LIMIT 1''', (Config.MACHINE_ID,))
+        row = c.fetchone()
+        conn.close()
+        
+        # Ne pas écraser une donnée Arduino arrivée entre-temps
+        if row and current_data['last_update'] is None:
+            current_data.update({
+                'vibration': row[1],
+                'vibration_percent': row[2],
+                'pressure': row[3],
+                'pressure_percent': row[4],
+                'status': row[5],
+                'last_update': row[0],
+                'data_source': 'cache_bd'
+            })
+            marquer_modification()
+    except Exception as e:
+        print(f"❌ Erreur préchauffage: {e}")
+    
+    etat_demarrage['cache_chaud'] = True
+    etat_demarrage['pret_ms'] = duree_depuis_demarrage()
+    print(f"✅ Cache préchauffé en {etat_demarrage['pret_ms']} ms")
+    return True
+
+def preparer_bd():
+    """Réessaie jusqu'à ce que la BD soit utilisable (/api/health reste en 503 d'ici là)"""
+    while not rechauffer_cache():
+        print("⏳ Nouvel essai BD dans 5 s")
+        time.sleep(5)
+
 # === LECTURE SÉRIE ARDUINO ===
 def lire_arduino_serial():
     """Lit les données série d'Arduino en continu"""
     global current_data, ser, serial_active
+    import serial  # pyserial est lent à importer: hors du chemin de démarrage
+    
+    # Les sauvegardes ont besoin de la table sensor_data
+    db_prete.wait()
+    etat_demarrage['serie_demarree'] = True
     
     print(f"🔄 Tentative connexion série sur {Config.SERIAL_PORT}...")
-    time.sleep(2)  # Attendre
+    if not Config.DEMARRAGE_RAPIDE:
+        time.sleep(2)  # Attendre
     
     while True:
         try:
@@ -92,6 +252,7 @@ def lire_arduino_serial():
                 print(f"✅ Connexion série établie sur {Config.SERIAL_PORT}")
                 current_data['serial_active'] = True
                 current_data['data_source'] = f'arduino_{Config.SERIAL_PORT}'
+                marquer_modification()
                 
                 # Lecture continue
                 while serial_active and ser and ser.is_open:
@@ -116,47 +277,57 @@ def lire_arduino_serial():
             print(f"❌ Erreur connexion: {e}")
             current_data['serial_active'] = False
             current_data['data_source'] = 'erreur_connexion'
+            marquer_modification()
             time.sleep(5)
 
 def traiter_donnees_arduino(line):
     """Traite une ligne de données Arduino"""
     try:
-        # Format Arduino: V:1.5(85%) P:500(83%) E:1
-        vib_match = re.search(r'V:([\d.]+)\((\d+)%\)', line)
-        press_match = re.search(r'P:(\d+)\((\d+)%\)', line)
-        status_match = re.search(r'E:(\d+)', line)
-        
-        if vib_match and press_match and status_match:
-            vibration = float(vib_match.group(1))
-            vibration_percent = int(vib_match.group(2))
-            pressure = int(press_match.group(1))
-            pressure_percent = int(press_match.group(2))
-            status = int(status_match.group(1))
+        # Format Arduino: V:1.5(85%) P:500(83%) E:1 [ID:machine_2]
+        mesure = analyser_trame(line)
+        machine = extraire_machine(line, Config.MACHINE_ID)
+        
+        if mesure:
+            vibration, vibration_percent, pressure, pressure_percent, status = mesure
             
             current_time = datetime.now()
             
-            # Mettre à jour les données temps réel
-            current_data.update({
-                'vibration': vibration,
-                'vibration_percent': vibration_percent,
-                'pressure': pressure,
-                'pressure_percent': pressure_percent,
-                'status': status,
-                'last_update': current_time.isoformat(),
-                'data_source': 'arduino_temps_reel'
-            })
+            # Mettre à jour les données temps réel (machine affichée seulement)
+            if machine == Config.MACHINE_ID:
+                current_data.update({
+                    'vibration': vibration,
+                    'vibration_percent': vibration_percent,
+                    'pressure': pressure,
+                    'pressure_percent': pressure_percent,
+                    'status': status,
+                    'last_update': current_time.isoformat(),
+                    'data_source': 'arduino_temps_reel'
+                })
             
             # Sauvegarder
-            if save_data(vibration, vibration_percent, pressure, pressure_percent, status):
+            if save_data(vibration, vibration_percent, pressure, pressure_percent, status, machine):
                 print(f"✅ Données traitées et sauvegardées")
             
+            mettre_a_jour_flotte(machine, status, vibration, pressure)
+            
+            # Statut recalculé avec le profil de la machine (le firmware garde ses seuils fixes);
+            # après la sauvegarde: une erreur du moteur ne fait pas perdre la trame
+            host_status = evaluer_regles(machine, vibration, pressure)
+            if machine == Config.MACHINE_ID:
+                current_data['host_status'] = host_status
+            marquer_modification()
+            
         elif "URGENCE" in line or "ARRET" in line:
             current_time = datetime.now()
-            current_data.update({
-                'status': 4,
-                'last_update': current_time.isoformat(),
-                'data_source': 'urgence_arduino'
-            })
+            if machine == Config.MACHINE_ID:
+                current_data.update({
+                    'status': 4,
+                    'last_update': current_time.isoformat(),
+                    'data_source': 'urgence_arduino',
+                    'host_status': None
+                })
+            mettre_a_jour_flotte(machine, 4)
+            marquer_modification()
             print(f"🚨 URGENCE DÉTECTÉE")
             
         else:
@@ -165,37 +336,111 @@ def traiter_donnees_arduino(line):
     except Exception as e:
         print(f"❌ Erreur traitement: {e}")
 
+# === CACHE DES RÉPONSES ===
+def dernier_id():
+    """Plus grand id de sensor_data: change aussi quand un autre processus (backfill) écrit"""
+    conn = sqlite3.connect(Config.DB_NAME)
+    row = conn.execute('SELECT MAX(id) FROM sensor_data').fetchone()
+    conn.close()
+    return row[0] or 0
+
+def reponse_json_cachee(cle, construire, version_bd=None):
+    """Sert une réponse JSON pré-encodée, recalculée seulement si les données ont changé
+
+    version_bd complète la version interne pour les réponses lues en base.
+    """
+    version = version_donnees  # Lue avant construction: un changement concurrent forcera un recalcul
+    if version_bd is not None:
+        version = f'{version}.{version_bd}'
+    entree = cache_reponses.get(cle)
+    
+    if entree is None or entree['version'] != version:
+        corps = json.dumps(construire(), separators=(',', ':')).encode('utf-8')
+        entree = {
+            'version': version,
+            'etag': f'{ID_DEMARRAGE}-{version}',
+            'corps': corps,
+            'corps_gzip': gzip.compress(corps) if len(corps) >= Config.TAILLE_MIN_GZIP else None
+        }
+        if len(cache_reponses) >= Config.TAILLE_MAX_CACHE:
+            cache_reponses.clear()
+        cache_reponses[cle] = entree
+    
+    # Chaque encodage a son propre ETag; un client peut revalider avec l'un ou l'autre
+    etag_gzip = entree['etag'] + '-gz'
+    gzip_accepte = entree['corps_gzip'] is not None and request.accept_encodings.quality('gzip') > 0
+    etag = etag_gzip if gzip_accepte else entree['etag']
+    
+    if entree['etag'] in request.if_none_match or etag_gzip in request.if_none_match:
+        reponse = Response(status=304)
+    elif gzip_accepte:
+        reponse = Response(entree['corps_gzip'], mimetype='application/json')
+        reponse.headers['Content-Encoding'] = 'gzip'
+    else:
+        reponse = Response(entree['corps'], mimetype='application/json')
+    
+    reponse.set_etag(etag)
+    reponse.headers['Cache-Control'] = 'no-cache'
+    reponse.headers['Vary'] = 'Accept-Encoding'
+    return reponse
+
 # === ROUTES API ===
+@app.before_request
+def mesurer_premiere_requete():
+    """Mesure le temps jusqu'à la première requête servie"""
+    if etat_demarrage['premiere_requete_ms'] is None:
+        etat_demarrage['premiere_requete_ms'] = duree_depuis_demarrage()
+        print(f"⏱️ Première requête après {etat_demarrage['premiere_requete_ms']} ms")
+
 @app.route('/api/current')
 def api_current():
     """Retourne les données actuelles"""
-    return jsonify(current_data)
+    return reponse_json_cachee('current', lambda: dict(current_data))
+
+def lire_historique(machine, since=None, since_id=None):
+    """Lit les 20 dernières mesures d'une machine, ou seulement celles postérieures au curseur
+    (`since`, `since_id`)"""
+    conn = sqlite3.connect(Config.DB_NAME)
+    c = conn.cursor()
+    # Curseur (timestamp, id), dans l'ordre de la première lecture: timestamp n'a qu'une
+    # résolution d'une seconde, et le backfill insère d'anciennes mesures avec de nouveaux id
+    if since is not None and since_id is not None:
+        c.execute('''SELECT timestamp, vibration, vibration_percent, pressure, pressure_percent, status, id 
+                     FROM sensor_data 
+                     WHERE machine = ? AND (timestamp, id) > (?, ?)
+                     ORDER BY timestamp DESC, id DESC LIMIT 20''', (machine, since, since_id))
+    else:
+        c.execute('''SELECT timestamp, vibration, vibration_percent, pressure, pressure_percent, status, id 
+                     FROM sensor_data 
+                     WHERE machine = ?
+                     ORDER BY timestamp DESC, id DESC LIMIT 20''', (machine,))
+    data = c.fetchall()
+    conn.close()
+    
+    history = []
+    for row in data:
+        history.append({
+            'timestamp': row[0],
+            'vibration': row[1],
+            'vibration_percent': row[2],
+            'pressure': row[3],
+            'pressure_percent': row[4],
+            'status': row[5],
+            'id': row[6]
+        })
+    
+    print(f"📊 Historique: {len(history)} enregistrements")
+    return history
 
 @app.route('/api/history')
 def api_history():
-    """Retourne l'historique des données"""
+    """Retourne l'historique des données (?machine=, ?since=timestamp&since_id=id pour un delta)"""
+    machine = request.args.get('machine', Config.MACHINE_ID)
+    since = request.args.get('since')
+    since_id = request.args.get('since_id', type=int)
     try:
-        conn = sqlite3.connect(Config.DB_NAME)
-        c = conn.cursor()
-        c.execute('''SELECT timestamp, vibration, vibration_percent, pressure, pressure_percent, status 
-                     FROM sensor_data 
-                     ORDER BY timestamp DESC LIMIT 20''')
-        data = c.fetchall()
-        conn.close()
-        
-        history = []
-        for row in data:
-            history.append({
-                'timestamp': row[0],
-                'vibration': row[1],
-                'vibration_percent': row[2],
-                'pressure': row[3],
-                'pressure_percent': row[4],
-                'status': row[5]
-            })
-        
-        print(f"📊 Historique: {len(history)} enregistrements")
-        return jsonify(history)
+        return reponse_json_cachee(f'history?machine={machine}&since={since}&since_id={since_id}',
+                                   lambda: lire_historique(machine, since, since_id), dernier_id())
     except Exception as e:
         print(f"❌ Erreur historique: {e}")
         return jsonify([])
@@ -203,7 +448,7 @@ def api_history():
 @app.route('/api/status')
 def api_status():
     """Retourne le statut de la connexion"""
-    return jsonify({
+    return reponse_json_cachee('status', lambda: {
         'serial_port': Config.SERIAL_PORT,
         'baud_rate': Config.BAUD_RATE,
         'serial_active': current_data['serial_active'],
@@ -214,6 +459,36 @@ def api_status():
         'pressure': current_data['pressure']
     })
 
+@app.route('/api/fleet')
+def api_fleet():
+    """Retourne les agrégats de la flotte par étiquette"""
+    return reponse_json_cachee('fleet', lambda: obtenir_flotte().resume())
+
+@app.route('/api/rules')
+def api_rules():
+    """Retourne le statut de chaque machine selon son profil de seuils"""
+    moteur = obtenir_regles()
+    if moteur is None:
+        return jsonify({'error': 'moteur de règles indisponible (NumPy manquant)'}), 503
+    # Un rechargement change la version des données: la réponse en cache n'est pas resservie
+    moteur.verifier()
+    return reponse_json_cachee('rules', moteur.resume)
+
+@app.route('/api/health')
+def api_health():
+    """Retourne l'état de préparation du serveur"""
+    pret = etat_demarrage['db_prete'] and etat_demarrage['cache_chaud']
+    return jsonify({
+        'ready': pret,
+        'db_ready': etat_demarrage['db_prete'],
+        'cache_warm': etat_demarrage['cache_chaud'],
+        'serial_started': etat_demarrage['serie_demarree'],
+        'serial_active': current_data['serial_active'],
+        'ready_ms': etat_demarrage['pret_ms'],
+        'first_request_ms': etat_demarrage['premiere_requete_ms'],
+        'uptime_ms': duree_depuis_demarrage()
+    }), 200 if pret else 503
+
 # Le HTML TEMPLATE reste identique à celui que vous avez fourni
 HTML_TEMPLATE = '''<!DOCTYPE html>
 <html lang="fr">
@@ -464,7 +739,7 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
             <div class="status-card waiting" id="statusCard">
                 <div class="status-label">STATUT SYSTÈME</div>
                 <div class="status-value waiting" id="statusValue">ATTENTE</div>
-                <div class="status-unit">Code: --</div>
+                <div class="status-unit" id="statusCode">Code: --</div>
                 <div class="status-time" id="statusTime">--:--:--</div>
             </div>
             
@@ -514,8 +789,23 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
     </div>
 
     <script>
+        const MAX_POINTS = 20;  // Points par graphique
+        const MAX_ROWS = 10;    // Lignes du tableau historique
+        const DB_TIME = /^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$/;
+        const STATUS_INFO = {
+            1: ['NORMAL', 'normal', '#10b981'],
+            2: ['ALERTE', 'warning', '#f59e0b'],
+            3: ['CRITIQUE', 'critical', '#ef4444'],
+            4: ['URGENCE', 'critical', '#dc2626']
+        };
+        
         let vibrationChart, pressureChart;
-        let historicalData = [];
+        let lastEtag = null;        // ETag de la dernière réponse /api/current traitée
+        let lastUpdate;             // last_update de la dernière réponse /api/current
+        let lastRow = null;         // Ligne la plus récente (timestamp, id) reçue de /api/history
+        let historyPending = false, historyAgain = false;
+        const elements = {};
+        const shown = {};
         
         function initializeCharts() {
             const vibCtx = document.getElementById('vibrationChart').getContext('2d');
@@ -549,57 +839,79 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
         
         function updateData() {
             fetch('/api/current')
-                .then(response => response.json())
+                .then(response => {
+                    // Réponse revalidée (304) ou identique: rien à redessiner
+                    const etag = response.headers.get('ETag');
+                    if (etag && etag === lastEtag) return null;
+                    lastEtag = etag;
+                    return response.json();
+                })
                 .then(data => {
+                    if (!data) return;
                     updateDisplay(data);
                     updateConnectionStatus(data);
-                    updateHistory();
+                    if (data.last_update !== lastUpdate) {
+                        lastUpdate = data.last_update;
+                        updateHistory();
+                    }
                 })
                 .catch(error => {
                     console.error('Erreur:', error);
                 });
         }
         
+        function el(id) {
+            return elements[id] || (elements[id] = document.getElementById(id));
+        }
+        
+        // Ne touche au DOM que si la valeur affichée change
+        function setText(id, text) {
+            if (shown[id] === text) return;
+            shown[id] = text;
+            el(id).textContent = text;
+        }
+        
+        function setClass(id, cls) {
+            const key = id + '.class';
+            if (shown[key] === cls) return;
+            shown[key] = cls;
+            el(id).className = cls;
+        }
+        
         function updateDisplay(data) {
             // Vibration
             const vibValue = data.vibration !== null ? data.vibration.toFixed(2) + ' g' : '--.-- g';
             const vibPercent = data.vibration_percent !== null ? data.vibration_percent + '%' : '--%';
             
-            document.getElementById('vibrationValue').textContent = vibValue;
-            document.getElementById('vibrationPercent').textContent = vibPercent;
-            document.getElementById('vibrationTime').textContent = formatTime(data.last_update);
+            setText('vibrationValue', vibValue);
+            setText('vibrationPercent', vibPercent);
+            setText('vibrationTime', formatTime(data.last_update));
             
             // Pression
             const pressValue = data.pressure !== null ? data.pressure.toString() : '---';
             const pressPercent = data.pressure_percent !== null ? data.pressure_percent + '%' : '--%';
             
-            document.getElementById('pressureValue').textContent = pressValue;
-            document.getElementById('pressurePercent').textContent = pressPercent;
-            document.getElementById('pressureTime').textContent = formatTime(data.last_update);
+            setText('pressureValue', pressValue);
+            setText('pressurePercent', pressPercent);
+            setText('pressureTime', formatTime(data.last_update));
             
             // Statut
             updateStatus(data.status, data.last_update);
             
             // Source
-            document.getElementById('dataSource').textContent = 
-                data.data_source === 'arduino_temps_reel' ? 'Arduino (temps réel)' : data.data_source;
-            document.getElementById('lastDataTime').textContent = 
-                data.last_update ? formatTime(data.last_update) : 'Jamais';
-            
-            // Graphiques
-            if (data.vibration !== null && data.pressure !== null) {
-                updateCharts(data);
-            }
+            setText('dataSource', 
+                data.data_source === 'arduino_temps_reel' ? 'Arduino (temps réel)' : data.data_source);
+            setText('lastDataTime', data.last_update ? formatTime(data.last_update) : 'Jamais');
             
-            document.getElementById('pageUpdate').textContent = 
-                'Page chargée à: ' + new Date().toLocaleTimeString('fr-FR');
-            document.getElementById('dataUpdate').textContent = 
-                'Dernière donnée: ' + formatTime(data.last_update);
+            setText('pageUpdate', 'Page chargée à: ' + new Date().toLocaleTimeString('fr-FR'));
+            setText('dataUpdate', 'Dernière donnée: ' + formatTime(data.last_update));
         }
         
         function formatTime(timestamp) {
             if (!timestamp) return '--:--:--';
             try {
+                // Horodatage SQLite (CURRENT_TIMESTAMP): UTC sans fuseau
+                if (DB_TIME.test(timestamp)) timestamp = timestamp.replace(' ', 'T') + 'Z';
                 return new Date(timestamp).toLocaleTimeString('fr-FR');
             } catch {
                 return '--:--:--';
@@ -607,126 +919,137 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
         }
         
         function updateStatus(status, timestamp) {
-            const card = document.getElementById('statusCard');
-            const value = document.getElementById('statusValue');
-            const time = document.getElementById('statusTime');
-            
             if (status === null) {
-                card.className = 'status-card waiting';
-                value.textContent = 'ATTENTE';
-                value.className = 'status-value waiting';
-                document.querySelector('#statusCard .status-unit').textContent = 'Code: --';
-                time.textContent = '--:--:--';
+                setClass('statusCard', 'status-card waiting');
+                setText('statusValue', 'ATTENTE');
+                setClass('statusValue', 'status-value waiting');
+                setText('statusCode', 'Code: --');
+                setText('statusTime', '--:--:--');
                 return;
             }
             
-            let text, cls;
-            switch(status) {
-                case 1: text = 'NORMAL'; cls = 'normal'; break;
-                case 2: text = 'ALERTE'; cls = 'warning'; break;
-                case 3: text = 'CRITIQUE'; cls = 'critical'; break;
-                case 4: text = 'URGENCE'; cls = 'critical'; break;
-                default: text = 'INCONNU'; cls = 'waiting';
-            }
+            const [text, cls] = STATUS_INFO[status] || ['INCONNU', 'waiting'];
             
-            card.className = `status-card ${cls}`;
-            value.textContent = text;
-            value.className = 'status-value';
-            document.querySelector('#statusCard .status-unit').textContent = `Code: ${status}`;
-            time.textContent = formatTime(timestamp);
+            setClass('statusCard', `status-card ${cls}`);
+            setText('statusValue', text);
+            setClass('statusValue', 'status-value');
+            setText('statusCode', `Code: ${status}`);
+            setText('statusTime', formatTime(timestamp));
+        }
+        
+        // Ajoute les points en place; les tableaux du graphique restent bornés à MAX_POINTS
+        function pushPoint(chart, label, value) {
+            const labels = chart.data.labels;
+            const values = chart.data.datasets[0].data;
+            labels.push(label);
+            values.push(value);
+            if (labels.length > MAX_POINTS) {
+                labels.shift();
+                values.shift();
+            }
         }
         
-        function updateCharts(data) {
+        function updateCharts(rows) {
             if (!vibrationChart || !pressureChart) return;
             
-            const now = new Date();
-            const timeLabel = now.toLocaleTimeString('fr-FR');
-            
-            historicalData.push({
-                time: timeLabel,
-                vibration: data.vibration,
-                pressure: data.pressure
+            rows.forEach(item => {
+                const timeLabel = formatTime(item.timestamp);
+                pushPoint(vibrationChart, timeLabel, item.vibration);
+                pushPoint(pressureChart, timeLabel, item.pressure);
             });
-            
-            if (historicalData.length > 20) historicalData.shift();
-            
-            vibrationChart.data.labels = historicalData.map(d => d.time);
-            vibrationChart.data.datasets[0].data = historicalData.map(d => d.vibration);
             vibrationChart.update('none');
-            
-            pressureChart.data.labels = historicalData.map(d => d.time);
-            pressureChart.data.datasets[0].data = historicalData.map(d => d.pressure);
             pressureChart.update('none');
             
-            document.getElementById('vibrationChartInfo').textContent = 
-                `Dernière: ${data.vibration.toFixed(2)}g | ${historicalData.length} points`;
-            document.getElementById('pressureChartInfo').textContent = 
-                `Dernière: ${data.pressure} | ${historicalData.length} points`;
+            const last = rows[rows.length - 1];
+            const points = vibrationChart.data.labels.length;
+            setText('vibrationChartInfo', 
+                `Dernière: ${last.vibration !== null ? last.vibration.toFixed(2) : '--.--'}g | ${points} points`);
+            setText('pressureChartInfo', 
+                `Dernière: ${last.pressure !== null ? last.pressure : '--'} | ${points} points`);
         }
         
         function updateConnectionStatus(data) {
-            const statusElem = document.getElementById('connectionStatus');
-            const value = document.getElementById('connectionValue');
-            const detail = document.getElementById('connectionDetail');
-            const port = document.getElementById('portStatus');
-            
             if (data.data_source.includes('arduino')) {
-                statusElem.className = 'connection-status connected';
-                value.textContent = '🟢 CONNECTÉ';
-                detail.textContent = 'Arduino → COM1 → COM3';
-                port.textContent = 'Connexion: Arduino connecté';
+                setClass('sourceCard', 'status-card normal');
+                setText('connectionValue', '🟢 CONNECTÉ');
+                setText('connectionDetail', 'Arduino → COM1 → COM3');
+                setText('portStatus', 'Connexion: Arduino connecté');
             } else if (data.data_source === 'erreur_connexion') {
-                statusElem.className = 'connection-status disconnected';
-                value.textContent = '🔴 ERREUR';
-                detail.textContent = 'Port COM3 inaccessible';
-                port.textContent = 'Connexion: Erreur COM3';
+                setClass('sourceCard', 'status-card critical');
+                setText('connectionValue', '🔴 ERREUR');
+                setText('connectionDetail', 'Port COM3 inaccessible');
+                setText('portStatus', 'Connexion: Erreur COM3');
             } else {
-                statusElem.className = 'connection-status waiting';
-                value.textContent = '🟡 ATTENTE';
-                detail.textContent = 'En attente Arduino...';
-                port.textContent = 'Connexion: En attente';
+                setClass('sourceCard', 'status-card waiting');
+                setText('connectionValue', '🟡 ATTENTE');
+                setText('connectionDetail', 'En attente Arduino...');
+                setText('portStatus', 'Connexion: En attente');
             }
         }
         
+        function buildHistoryRow(item) {
+            const [statusText, , statusColor] = STATUS_INFO[item.status] || ['--', 'waiting', '#64748b'];
+            const row = document.createElement('div');
+            row.className = 'table-row';
+            [
+                formatTime(item.timestamp),
+                item.vibration !== null ? item.vibration.toFixed(2) + ' g' : '--.--',
+                item.vibration_percent !== null ? item.vibration_percent + '%' : '--%',
+                item.pressure !== null ? item.pressure : '--',
+                statusText
+            ].forEach(text => {
+                const cell = document.createElement('div');
+                cell.textContent = text;
+                row.appendChild(cell);
+            });
+            row.lastChild.style.color = statusColor;
+            return row;
+        }
+        
+        // Insère les nouvelles lignes en tête et retire les plus anciennes
+        function updateHistoryTable(rows) {
+            const table = el('historyTable');
+            const empty = table.querySelector('.empty-history');
+            if (empty) empty.remove();
+            
+            rows.slice(-MAX_ROWS).forEach(item => {
+                table.insertBefore(buildHistoryRow(item), table.firstChild);
+            });
+            while (table.children.length > MAX_ROWS) {
+                table.removeChild(table.lastChild);
+            }
+        }
+        
+        // Ne récupère que les mesures enregistrées après le dernier id reçu
         function updateHistory() {
-            fetch('/api/history')
+            if (historyPending) {
+                historyAgain = true;
+                return;
+            }
+            historyPending = true;
+            
+            const url = lastRow !== null
+                ? '/api/history?' + new URLSearchParams({since: lastRow.timestamp, since_id: lastRow.id})
+                : '/api/history';
+            
+            fetch(url)
                 .then(response => response.json())
                 .then(history => {
-                    const table = document.getElementById('historyTable');
+                    if (history.length === 0) return;
                     
-                    if (history.length === 0) {
-                        table.innerHTML = '<div class="empty-history">Aucune donnée reçue...</div>';
-                        return;
-                    }
-                    
-                    let html = '';
-                    history.slice(0, 10).forEach(item => {
-                        const time = new Date(item.timestamp);
-                        const timeStr = time.toLocaleTimeString('fr-FR');
-                        
-                        let statusText, statusColor;
-                        switch(item.status) {
-                            case 1: statusText = 'NORMAL'; statusColor = '#10b981'; break;
-                            case 2: statusText = 'ALERTE'; statusColor = '#f59e0b'; break;
-                            case 3: statusText = 'CRITIQUE'; statusColor = '#ef4444'; break;
-                            case 4: statusText = 'URGENCE'; statusColor = '#dc2626'; break;
-                            default: statusText = '--'; statusColor = '#64748b';
-                        }
-                        
-                        html += `
-                            <div class="table-row">
-                                <div>${timeStr}</div>
-                                <div>${item.vibration !== null ? item.vibration.toFixed(2) + ' g' : '--.--'}</div>
-                                <div>${item.vibration_percent !== null ? item.vibration_percent + '%' : '--%'}</div>
-                                <div>${item.pressure !== null ? item.pressure : '--'}</div>
-                                <div style="color: ${statusColor}">${statusText}</div>
-                            </div>
-                        `;
-                    });
-                    
-                    table.innerHTML = html;
+                    lastRow = history[0];  // Triée par timestamp puis id décroissants
+                    const rows = history.slice().reverse();
+                    updateCharts(rows);
+                    updateHistoryTable(rows);
                 })
-                .catch(error => console.error('Erreur historique:', error));
+                .catch(error => console.error('Erreur historique:', error))
+                .finally(() => {
+                    historyPending = false;
+                    if (historyAgain) {
+                        historyAgain = false;
+                        updateHistory();
+                    }
+                });
         }
         
         function checkStatus() {
@@ -746,9 +1069,8 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
         document.addEventListener('DOMContentLoaded', function() {
             initializeCharts();
             updateData();
-            updateHistory();
+            // L'historique est rechargé (en delta) dès que /api/current signale une nouvelle donnée
             setInterval(updateData, 2000);
-            setInterval(updateHistory, 5000);
         });
     </script>
 </body>
@@ -760,7 +1082,16 @@ def dashboard():
     return render_template_string(HTML_TEMPLATE)
 
 if __name__ == '__main__':
-    init_db()
+    # python iot_site.py backfill <fichiers...>: import hors ligne de journaux enregistrés
+    if len(sys.argv) > 1 and sys.argv[1] == 'backfill':
+        from backfill import main
+        sys.exit(main(sys.argv[2:]))
+    
+    if Config.DEMARRAGE_RAPIDE:
+        # Le serveur écoute immédiatement, /api/health indique quand la BD est prête
+        threading.Thread(target=preparer_bd, daemon=True).start()
+    elif not rechauffer_cache():
+        threading.Thread(target=preparer_bd, daemon=True).start()
     
     # Démarrer la lecture série
     serial_thread = threading.Thread(target=lire_arduino_serial, daemon=True)
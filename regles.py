@@ -0,0 +1,185 @@
+"""Moteur de règles côté hôte: seuils par machine compilés en table NumPy
+
+Fichier de profils (JSON, ou YAML si PyYAML est installé):
+    {"defaut": {...}, "modeles": {"HX200": {...}}, "machines": {"press_02": {"modele": "HX200", "seuil_alerte": 120}}}
+Chaque niveau surcharge le précédent: défaut → modèle → machine.
+"""
+import json
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+# Valeurs du firmware (PhysicalPixel.ino)
+PROFIL_DEFAUT = {
+    'vibration_normale': 1.5,
+    'pression_normale': 500.0,
+    'seuil_alerte': 133,
+    'seuil_critique': 187,
+    'pression_haute_alerte': 140,
+    'pression_haute_critique': 170,
+    'pression_basse_alerte': 40,
+    'pression_basse_critique': 30
+}
+COLONNES = tuple(PROFIL_DEFAUT)
+NORMALES = ('vibration_normale', 'pression_normale')  # Diviseurs des pourcentages
+VN, PN, SA, SC, PHA, PHC, PBA, PBC = range(len(COLONNES))
+
+def lire_profils(chemin):
+    """Lit le fichier de profils; {} s'il n'existe pas"""
+    if not chemin or not os.path.exists(chemin):
+        return {}
+    with open(chemin, encoding='utf-8') as f:
+        if chemin.endswith(('.yaml', '.yml')):
+            import yaml  # Optionnel: seulement pour les profils YAML
+            return yaml.safe_load(f) or {}
+        return json.load(f)
+
+def profil_machine(profils, machine):
+    """Profil effectif d'une machine: défaut → modèle → machine"""
+    profil = dict(PROFIL_DEFAUT)
+    profil.update(profils.get('defaut', {}))
+    propre = profils.get('machines', {}).get(machine, {})
+    profil.update(profils.get('modeles', {}).get(propre.get('modele'), {}))
+    profil.update(propre)
+    return profil
+
+def valeurs(profil):
+    return [float(profil[col]) for col in COLONNES]
+
+def valider(profil, origine):
+    """Lève ValueError si un seuil n'est pas un nombre fini ou si une valeur normale est <= 0"""
+    for col in COLONNES:
+        valeur = profil[col]
+        if isinstance(valeur, bool) or not isinstance(valeur, (int, float)) or not math.isfinite(valeur):
+            raise ValueError(f"{origine}: {col} doit être un nombre ({valeur!r})")
+    for col in NORMALES:
+        # Le firmware renverrait 0 %, la table donnerait inf/NaN
+        if profil[col] <= 0:
+            raise ValueError(f"{origine}: {col} doit être > 0 ({profil[col]!r})")
+
+def verifier_profils(profils):
+    """Valide le défaut, chaque modèle et chaque machine, même jamais vue"""
+    valider(profil_machine(profils, None), 'defaut')
+    for modele, surcharge in profils.get('modeles', {}).items():
+        profil = profil_machine(profils, None)
+        profil.update(surcharge)
+        valider(profil, f'modeles.{modele}')
+    for machine in profils.get('machines', {}):
+        valider(profil_machine(profils, machine), f'machines.{machine}')
+
+def compiler(profils, machines, lignes):
+    """Table (lignes × COLONNES) des seuils dans l'ordre de `machines`; le reste au profil par défaut"""
+    table = np.tile(valeurs(profil_machine(profils, None)), (lignes, 1))
+    for i, machine in enumerate(machines):
+        table[i] = valeurs(profil_machine(profils, machine))
+    return table
+
+def evaluer_table(table, vibration, pression):
+    """Statut de toutes les machines en une passe: 1 normal, 2 alerte, 3 critique, 0 sans donnée"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Même calcul que calculerPourcentage() du firmware: entier tronqué, borné à 0..300
+        p_vib = np.clip(np.trunc(vibration / table[:, VN] * 100), 0, 300)
+        p_press = np.clip(np.trunc(pression / table[:, PN] * 100), 0, 300)
+    
+    critique = (p_vib >= table[:, SC]) | (p_press >= table[:, PHC]) | (p_press <= table[:, PBC])
+    alerte = (p_vib >= table[:, SA]) | (p_press >= table[:, PHA]) | (p_press <= table[:, PBA])
+    
+    statuts = np.where(critique, 3, np.where(alerte, 2, 1))
+    statuts[np.isnan(vibration) | np.isnan(pression)] = 0
+    return statuts
+
+class MoteurRegles:
+    """Évalue le statut de la flotte à chaque trame et recharge les profils modifiés"""
+    
+    def __init__(self, chemin, intervalle_rechargement=2.0, au_rechargement=None):
+        self.chemin = chemin
+        self.intervalle_rechargement = intervalle_rechargement
+        self.au_rechargement = au_rechargement  # Appelé après chaque chargement réussi
+        self.verrou = threading.Lock()
+        self.index = {}  # machine -> ligne de la table
+        self.capacite = 16
+        self.vibration = np.full(self.capacite, np.nan)
+        self.pression = np.full(self.capacite, np.nan)
+        self.statuts = np.zeros(self.capacite, dtype=int)
+        self.mtime = None
+        self.prochaine_verification = 0.0
+        self.profils = {}
+        self.table = compiler({}, [], self.capacite)
+        self.charge_le = None
+        self.charger()
+    
+    def charger(self):
+        """(Re)compile la table; garde l'ancienne si le fichier est invalide"""
+        # Mémorisé même en cas d'erreur: pas de nouvel essai avant la prochaine modification
+        self.mtime = os.path.getmtime(self.chemin) if os.path.exists(self.chemin) else None
+        try:
+            profils = lire_profils(self.chemin)
+            verifier_profils(profils)
+            table = compiler(profils, list(self.index), self.capacite)
+        except Exception as e:
+            print(f"❌ Erreur profils: {e}")
+            return False
+        
+        self.profils, self.table = profils, table
+        self.charge_le = time.time()
+        # Les dernières mesures sont réévaluées avec les nouveaux seuils, sans attendre de trame
+        self.statuts = evaluer_table(self.table, self.vibration, self.pression)
+        print(f"✅ Profils chargés: {self.chemin} ({len(profils.get('machines', {}))} machines)")
+        if self.au_rechargement:
+            self.au_rechargement()
+        return True
+    
+    def verifier(self):
+        """Recharge les profils s'ils ont été modifiés, hors de toute trame"""
+        with self.verrou:
+            self.recharger_si_modifie()
+    
+    def recharger_si_modifie(self):
+        maintenant = time.monotonic()
+        if maintenant < self.prochaine_verification:
+            return
+        self.prochaine_verification = maintenant + self.intervalle_rechargement
+        mtime = os.path.getmtime(self.chemin) if os.path.exists(self.chemin) else None
+        if mtime != self.mtime:
+            self.charger()
+    
+    def ligne(self, machine):
+        """Index de la machine; agrandit les tableaux (capacité doublée) si besoin"""
+        i = self.index.get(machine)
+        if i is not None:
+            return i
+        
+        # Calculé avant toute modification: une erreur ne laisse pas de ligne orpheline
+        seuils = valeurs(profil_machine(self.profils, machine))
+        i = len(self.index)
+        if i >= self.capacite:
+            ajout = self.capacite
+            self.capacite *= 2
+            self.vibration = np.concatenate([self.vibration, np.full(ajout, np.nan)])
+            self.pression = np.concatenate([self.pression, np.full(ajout, np.nan)])
+            self.statuts = np.concatenate([self.statuts, np.zeros(ajout, dtype=int)])
+            self.table = compiler(self.profils, list(self.index), self.capacite)
+        self.table[i] = seuils
+        self.index[machine] = i
+        return i
+    
+    def evaluer(self, machine, vibration, pression):
+        """Intègre une trame et réévalue toute la flotte; retourne le statut de la machine"""
+        with self.verrou:
+            self.recharger_si_modifie()
+            i = self.ligne(machine)
+            self.vibration[i] = vibration
+            self.pression[i] = pression
+            self.statuts = evaluer_table(self.table, self.vibration, self.pression)
+            return int(self.statuts[i])
+    
+    def resume(self):
+        with self.verrou:
+            return {
+                'profiles_file': self.chemin,
+                'loaded_at': self.charge_le,
+                'machines': {m: int(self.statuts[i]) for m, i in self.index.items()}
+            }
@@ -0,0 +1,27 @@
+"""Analyse des trames Arduino: V:1.5(85%) P:500(83%) E:1 [ID:machine_2]"""
+import re
+
+RE_VIBRATION = re.compile(r'V:([\d.]+)\((\d+)%\)')
+RE_PRESSION = re.compile(r'P:(\d+)\((\d+)%\)')
+RE_STATUT = re.compile(r'E:(\d+)')
+RE_MACHINE = re.compile(r'ID:(\S+)')
+
+def analyser_trame(line):
+    """Retourne (vibration, vibration_percent, pressure, pressure_percent, status) ou None"""
+    vib_match = RE_VIBRATION.search(line)
+    press_match = RE_PRESSION.search(line)
+    status_match = RE_STATUT.search(line)
+    
+    if not (vib_match and press_match and status_match):
+        return None
+    
+    return (float(vib_match.group(1)),
+            int(vib_match.group(2)),
+            int(press_match.group(1)),
+            int(press_match.group(2)),
+            int(status_match.group(1)))
+
+def extraire_machine(line, defaut):
+    """Identifiant de machine porté par la trame, sinon la valeur par défaut"""
+    id_match = RE_MACHINE.search(line)
+    return id_match.group(1) if id_match else defaut